@@ -0,0 +1,223 @@
+"""
+Ponto de entrada ASGI da API de Lista de Tarefas
+================================================
+Serve a aplicação Flask de app.py em um servidor ASGI (ex. uvicorn).
+
+As rotas comuns são executadas pelo adaptador WSGI->ASGI, em um pool de
+threads (ASGI_THREADS), várias requisições ao mesmo tempo. O
+stream SSE de /tarefas/eventos é atendido de forma nativamente assíncrona:
+conexões ociosas não ocupam threads, e o acesso ao SQLite que ele precisa é
+feito em um executor de threads dedicado.
+
+Uso em produção:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+# Em produção o Swagger UI só é registrado com API_DOCS=1: o flasgger nem é importado
+os.environ.setdefault('API_DOCS', '0')
+
+from app import (
+    app, init_db, autenticar_requisicao, central_eventos, versao_atual,
+    eventos_desde, formatar_evento, SSE_HEARTBEAT
+)
+
+init_db()
+
+# Threads dedicadas ao SQLite usado pelos streams assíncronos
+executor_db = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_DB_THREADS', 8)),
+    thread_name_prefix='sqlite'
+)
+
+# Threads que executam as demais rotas (aplicação Flask)
+executor_wsgi = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_THREADS', 32)),
+    thread_name_prefix='wsgi'
+)
+
+
+class InstanciaWsgi(WsgiToAsgiInstance):
+    """Requisição do adaptador WSGI->ASGI executada no executor_wsgi.
+
+    O WsgiToAsgiInstance do asgiref usa sync_to_async com thread_sensitive=True,
+    que enfileira todas as requisições do processo em uma única thread: uma
+    exportação longa ou um hash de senha bloquearia as demais. Ele também não
+    chama ``close()`` do corpo da resposta, do qual dependem o fim dos streams
+    (stream_with_context) e as métricas.
+    """
+
+    def executar_wsgi(self, body):
+        respostas = []
+        aplicacao = self.wsgi_application
+
+        def chamar(environ, start_response):
+            resposta = aplicacao(environ, start_response)
+            respostas.append(resposta)
+            return resposta
+
+        self.wsgi_application = chamar
+        try:
+            WsgiToAsgiInstance.__dict__['run_wsgi_app'].func(self, body)
+        finally:
+            for resposta in respostas:
+                if hasattr(resposta, 'close'):
+                    resposta.close()
+
+    run_wsgi_app = sync_to_async(executar_wsgi, thread_sensitive=False, executor=executor_wsgi)
+
+
+class AdaptadorWsgi(WsgiToAsgi):
+    """WsgiToAsgi que cria uma InstanciaWsgi por requisição."""
+
+    async def __call__(self, scope, receive, send):
+        await InstanciaWsgi(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+app_wsgi = AdaptadorWsgi(app)
+
+
+async def executar_db(funcao, *args):
+    """Executa uma função bloqueante de banco no executor dedicado."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor_db, funcao, *args)
+
+
+def autenticar(auth_header):
+    """Autentica dentro de um contexto da aplicação (necessário para o pool)."""
+    with app.app_context():
+        return autenticar_requisicao(auth_header)
+
+
+async def responder_json(send, status, corpo):
+    """Envia uma resposta JSON simples."""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(corpo, ensure_ascii=False).encode()})
+
+
+async def aguardar_desconexao(receive):
+    """Termina quando o cliente fecha a conexão."""
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            return
+
+
+async def eventos_sse(scope, receive, send):
+    """Versão assíncrona de /tarefas/eventos (mesmo protocolo de gerar_eventos)."""
+    cabecalhos = dict(scope['headers'])
+    auth_header = cabecalhos.get(b'authorization')
+    usuario_atual, erro = await executar_db(
+        autenticar, auth_header.decode('latin-1') if auth_header is not None else None
+    )
+    if erro:
+        return await responder_json(send, 401, {'mensagem': erro})
+
+    ultimo_id = cabecalhos.get(b'last-event-id')
+    if ultimo_id is not None:
+        try:
+            ultimo_id = int(ultimo_id)
+        except ValueError:
+            return await responder_json(send, 400, {'erro': 'Last-Event-ID inválido!'})
+
+    usuario_id = usuario_atual['id']
+    loop = asyncio.get_running_loop()
+    chegou = asyncio.Event()
+    assinante = central_eventos.assinar(
+        usuario_id, aviso=lambda: loop.call_soon_threadsafe(chegou.set)
+    )
+    desconexao = asyncio.ensure_future(aguardar_desconexao(receive))
+
+    async def enviar(texto):
+        await send({'type': 'http.response.body', 'body': texto.encode(), 'more_body': True})
+
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*')
+            ]
+        })
+        await enviar(f'retry: {int(SSE_HEARTBEAT * 1000)}\n\n')
+        if ultimo_id is None:
+            ultimo_id = await executar_db(versao_atual, usuario_id)
+
+        pendentes = await executar_db(eventos_desde, usuario_id, ultimo_id)
+        while not desconexao.done():
+            for evento in pendentes:
+                # Eventos já entregues pelo reenvio chegam de novo pela fila
+                if evento['id'] > ultimo_id:
+                    ultimo_id = evento['id']
+                    await enviar(formatar_evento(evento))
+
+            chegou.clear()
+            pendentes = []
+            while not assinante.fila.empty():
+                pendentes.append(assinante.fila.get_nowait())
+            if pendentes:
+                continue
+            if assinante.descartado:
+                break
+
+            espera = asyncio.ensure_future(chegou.wait())
+            concluidas, _ = await asyncio.wait(
+                {espera, desconexao}, timeout=SSE_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            espera.cancel()
+            if not concluidas:
+                # Heartbeat: também entrega escritas feitas por outros processos
+                if await executar_db(versao_atual, usuario_id) > ultimo_id:
+                    pendentes = await executar_db(eventos_desde, usuario_id, ultimo_id)
+                else:
+                    await enviar(': ping\n\n')
+
+        if not desconexao.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # Cliente desconectou durante o envio
+        pass
+    finally:
+        desconexao.cancel()
+        central_eventos.cancelar(assinante)
+
+
+async def lifespan(receive, send):
+    """Trata o ciclo de vida do servidor ASGI."""
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            executor_db.shutdown(wait=False)
+            executor_wsgi.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """Aplicação ASGI: SSE assíncrono, demais rotas pela aplicação Flask."""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http' and scope['path'] == '/tarefas/eventos' and scope['method'] == 'GET':
+        return await eventos_sse(scope, receive, send)
+    return await app_wsgi(scope, receive, send)
@@ -0,0 +1,358 @@
+"""
+Métricas no formato Prometheus da API de Lista de Tarefas
+=========================================================
+Contadores, medidores e histogramas expostos em /metrics no formato texto
+do Prometheus (versão 0.0.4), sem dependências externas.
+
+Com vários processos (servidor.py), cada processo grava os próprios valores
+em um arquivo mapeado em memória dentro de METRICAS_DIR, e o worker que
+atende /metrics soma os arquivos de todos. Contadores e histogramas de
+workers já encerrados continuam na soma, para que os totais nunca diminuam;
+medidores contam apenas processos vivos. Sem METRICAS_DIR, os valores ficam
+na memória do processo (suficiente com um único processo).
+
+Uso:
+
+    registro = Registro(os.environ.get('METRICAS_DIR'))
+    requisicoes = registro.contador('api_requisicoes_total', 'Requisições', ['rota'])
+    requisicoes.incrementar('listar_tarefas')
+    print(registro.exportar())
+"""
+
+import bisect
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites padrão dos histogramas, em segundos
+LIMITES_DURACAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_ETAPAS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Limites dos histogramas de tamanho, em bytes
+LIMITES_TAMANHO = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+
+# ===== ARMAZENAMENTO DOS VALORES =====
+
+class ArmazenamentoMemoria:
+    """Valores das métricas na memória do processo."""
+
+    def __init__(self):
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def somar(self, itens):
+        """Soma cada ``(chave, valor)`` de ``itens`` ao valor atual da chave."""
+        with self._lock:
+            for chave, valor in itens:
+                self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def definir(self, chave, valor):
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+    def valores(self):
+        """Retorna {chave: valor}."""
+        with self._lock:
+            return dict(self._valores)
+
+
+class ArmazenamentoArquivos:
+    """Valores das métricas em um arquivo por processo, mapeado em memória.
+
+    Cada processo grava em ``<diretorio>/metricas_<pid>.db``, aberto na
+    primeira escrita (inclusive nos filhos criados com fork). O arquivo tem
+    8 bytes com o total de bytes usados, seguidos de registros
+    ``[tamanho da chave][chave em JSON][valor double]`` alinhados a 8 bytes.
+    Um registro novo é escrito antes de o total ser atualizado, então quem
+    lê o arquivo de outro processo nunca vê um registro pela metade.
+    """
+
+    TAMANHO_INICIAL = 1 << 16
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._pid = None
+        self._arquivo = None
+        self._mapa = None
+        self._usado = 0
+        self._posicoes = {}
+
+    def _caminho(self, pid):
+        return os.path.join(self.diretorio, f'metricas_{pid}.db')
+
+    def _abrir(self):
+        # O filho de um fork herda o mapa do pai e precisa de um arquivo próprio
+        self._pid = os.getpid()
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(self._pid)
+        existentes = list(_ler_registros(caminho)) if os.path.exists(caminho) else []
+        self._arquivo = open(caminho, 'a+b')
+        tamanho = max(os.path.getsize(caminho), self.TAMANHO_INICIAL)
+        self._arquivo.truncate(tamanho)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), tamanho)
+        # Um pid reutilizado continua o arquivo do processo anterior
+        self._usado = 8
+        self._posicoes = {}
+        struct.pack_into('q', self._mapa, 0, self._usado)
+        for chave, valor in existentes:
+            struct.pack_into('d', self._mapa, self._posicao(chave), valor)
+
+    def _crescer(self, minimo):
+        tamanho = len(self._mapa)
+        while tamanho < minimo:
+            tamanho *= 2
+        self._mapa.close()
+        self._arquivo.truncate(tamanho)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), tamanho)
+
+    def _posicao(self, chave):
+        """Posição do valor da chave no arquivo, criando o registro se necessário."""
+        posicao = self._posicoes.get(chave)
+        if posicao is None:
+            codificada = json.dumps(chave).encode('utf-8')
+            cabecalho = 4 + len(codificada)
+            cabecalho += -cabecalho % 8
+            if self._usado + cabecalho + 8 > len(self._mapa):
+                self._crescer(self._usado + cabecalho + 8)
+            struct.pack_into(f'i{len(codificada)}s', self._mapa, self._usado, len(codificada), codificada)
+            posicao = self._usado + cabecalho
+            struct.pack_into('d', self._mapa, posicao, 0.0)
+            self._usado = posicao + 8
+            struct.pack_into('q', self._mapa, 0, self._usado)
+            self._posicoes[chave] = posicao
+        return posicao
+
+    def somar(self, itens):
+        """Soma cada ``(chave, valor)`` de ``itens`` ao valor atual da chave."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._abrir()
+            for chave, valor in itens:
+                posicao = self._posicao(chave)
+                atual, = struct.unpack_from('d', self._mapa, posicao)
+                struct.pack_into('d', self._mapa, posicao, atual + valor)
+
+    def definir(self, chave, valor):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._abrir()
+            struct.pack_into('d', self._mapa, self._posicao(chave), float(valor))
+
+    def valores(self):
+        """Soma os valores de todos os processos; medidores, só dos processos vivos."""
+        valores = {}
+        for caminho in glob.glob(os.path.join(self.diretorio, 'metricas_*.db')):
+            try:
+                pid = int(os.path.basename(caminho)[len('metricas_'):-len('.db')])
+            except ValueError:
+                continue
+            vivo = _processo_vivo(pid)
+            for chave, valor in _ler_registros(caminho):
+                if chave[0] == 'gauge' and not vivo:
+                    continue
+                valores[chave] = valores.get(chave, 0.0) + valor
+        return valores
+
+
+def _ler_registros(caminho):
+    """Gera os ``(chave, valor)`` gravados em um arquivo de métricas."""
+    try:
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+    except FileNotFoundError:
+        return
+    if len(dados) < 8:
+        return
+    usado, = struct.unpack_from('q', dados, 0)
+    posicao = 8
+    while posicao < min(usado, len(dados)):
+        tamanho, = struct.unpack_from('i', dados, posicao)
+        chave = json.loads(dados[posicao + 4:posicao + 4 + tamanho])
+        cabecalho = 4 + tamanho
+        cabecalho += -cabecalho % 8
+        valor, = struct.unpack_from('d', dados, posicao + cabecalho)
+        yield (chave[0], chave[1], chave[2], tuple(chave[3])), valor
+        posicao += cabecalho + 8
+
+
+def _processo_vivo(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def limpar_diretorio(diretorio):
+    """Remove os arquivos de métricas de execuções anteriores (chamado pelo processo mestre)."""
+    for caminho in glob.glob(os.path.join(diretorio, 'metricas_*.db')):
+        os.remove(caminho)
+
+
+# ===== MÉTRICAS =====
+
+class Metrica:
+    """Base das métricas: nome, texto de ajuda e nomes dos rótulos.
+
+    Os valores dos rótulos são passados na mesma ordem de ``rotulos``.
+    """
+
+    tipo = None
+
+    def __init__(self, armazenamento, nome, ajuda, rotulos=()):
+        self.armazenamento = armazenamento
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+
+    def _chave(self, sufixo, valores_rotulos):
+        if len(valores_rotulos) != len(self.rotulos):
+            raise ValueError(f'{self.nome} espera os rótulos {self.rotulos}, recebeu {valores_rotulos!r}')
+        return (self.tipo, self.nome, sufixo, tuple(str(valor) for valor in valores_rotulos))
+
+    def amostras(self, valores):
+        """Linhas ``(nome, rótulos, valor)`` da exposição desta métrica."""
+        for (_, nome, sufixo, rotulos), valor in sorted(valores.items()):
+            yield nome + sufixo, dict(zip(self.rotulos, rotulos)), valor
+
+
+class Contador(Metrica):
+    """Valor que só aumenta (ex.: total de requisições)."""
+
+    tipo = 'counter'
+
+    def incrementar(self, *rotulos, valor=1):
+        self.armazenamento.somar([(self._chave('', rotulos), valor)])
+
+
+class Medidor(Metrica):
+    """Valor instantâneo (ex.: conexões em uso), somado entre os processos vivos."""
+
+    tipo = 'gauge'
+
+    def definir(self, valor, *rotulos):
+        self.armazenamento.definir(self._chave('', rotulos), valor)
+
+
+class Histograma(Metrica):
+    """Distribuição de valores em faixas cumulativas, com soma e contagem."""
+
+    tipo = 'histogram'
+
+    def __init__(self, armazenamento, nome, ajuda, rotulos=(), limites=LIMITES_DURACAO):
+        super().__init__(armazenamento, nome, ajuda, rotulos)
+        self.limites = tuple(float(limite) for limite in sorted(limites))
+
+    def observar(self, valor, *rotulos):
+        # Guarda a contagem de cada faixa isolada; a soma cumulativa é feita na exportação
+        faixa = bisect.bisect_left(self.limites, valor)
+        self.armazenamento.somar([
+            (self._chave('_bucket', (*rotulos, faixa)), 1),
+            (self._chave('_sum', (*rotulos, '')), valor)
+        ])
+
+    def _chave(self, sufixo, valores_rotulos):
+        # O último rótulo é interno: índice da faixa (vazio na soma)
+        chave = super()._chave(sufixo, valores_rotulos[:-1])
+        return chave[:3] + (chave[3] + (str(valores_rotulos[-1]),),)
+
+    @contextmanager
+    def medir(self, *rotulos):
+        """Observa o tempo, em segundos, gasto dentro do bloco ``with``."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *rotulos)
+
+    def amostras(self, valores):
+        series = {}
+        for (_, _, sufixo, rotulos), valor in valores.items():
+            serie = series.setdefault(rotulos[:-1], {'faixas': {}, 'soma': 0.0})
+            if sufixo == '_bucket':
+                serie['faixas'][int(rotulos[-1])] = valor
+            else:
+                serie['soma'] += valor
+
+        for rotulos, serie in sorted(series.items()):
+            base = dict(zip(self.rotulos, rotulos))
+            acumulado = 0.0
+            for indice, limite in enumerate((*self.limites, math.inf)):
+                acumulado += serie['faixas'].get(indice, 0.0)
+                yield self.nome + '_bucket', {**base, 'le': _formatar_numero(limite)}, acumulado
+            yield self.nome + '_sum', base, serie['soma']
+            yield self.nome + '_count', base, acumulado
+
+
+# ===== REGISTRO E EXPOSIÇÃO =====
+
+class Registro:
+    """Conjunto de métricas de uma aplicação e a exportação delas em texto."""
+
+    TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio
+        self.armazenamento = ArmazenamentoArquivos(diretorio) if diretorio else ArmazenamentoMemoria()
+        self._metricas = {}
+
+    def _registrar(self, metrica):
+        if metrica.nome in self._metricas:
+            raise ValueError(f'Métrica já registrada: {metrica.nome}')
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(self.armazenamento, nome, ajuda, rotulos))
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._registrar(Medidor(self.armazenamento, nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_DURACAO):
+        return self._registrar(Histograma(self.armazenamento, nome, ajuda, rotulos, limites))
+
+    def exportar(self):
+        """Texto da exposição de todas as métricas registradas."""
+        por_metrica = {}
+        for chave, valor in self.armazenamento.valores().items():
+            por_metrica.setdefault(chave[1], {})[chave] = valor
+
+        linhas = []
+        for nome, metrica in self._metricas.items():
+            linhas.append(f'# HELP {nome} {_escapar(metrica.ajuda, aspas=False)}')
+            linhas.append(f'# TYPE {nome} {metrica.tipo}')
+            for amostra, rotulos, valor in metrica.amostras(por_metrica.get(nome, {})):
+                if rotulos:
+                    texto = ','.join(f'{rotulo}="{_escapar(str(v))}"' for rotulo, v in rotulos.items())
+                    amostra = f'{amostra}{{{texto}}}'
+                linhas.append(f'{amostra} {_formatar_numero(valor)}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(texto, aspas=True):
+    texto = texto.replace('\\', r'\\').replace('\n', r'\n')
+    return texto.replace('"', r'\"') if aspas else texto
+
+
+def _formatar_numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    if valor == -math.inf:
+        return '-Inf'
+    return repr(float(valor))
+
+
+# Registro padrão da aplicação; com METRICAS_DIR, compartilhado entre os processos
+registro = Registro(os.environ.get('METRICAS_DIR'))
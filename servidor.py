@@ -0,0 +1,236 @@
+"""
+Servidor de produção multiprocesso da API de Lista de Tarefas
+=============================================================
+O processo mestre inicializa o banco uma única vez, carrega a aplicação,
+abre o socket de escuta e cria N workers com fork; todos compartilham o
+mesmo socket e atendem as requisições em threads.
+
+Sinais tratados pelo mestre:
+
+- SIGHUP: recarga sem downtime. Uma nova geração de workers é criada e só
+  então a anterior é encerrada de forma graciosa (termina as requisições em
+  andamento). Como a aplicação é pré-carregada, alterações no código exigem
+  reiniciar o mestre.
+- SIGTERM / SIGINT: encerramento gracioso de todos os workers.
+
+As métricas de /metrics somam todos os workers por meio de arquivos em
+METRICAS_DIR; sem a variável, o mestre usa um diretório temporário,
+removido ao encerrar.
+
+Uso:
+
+    python servidor.py --workers 4 --port 5000 --max-requisicoes 10000
+
+Disponível apenas em sistemas com fork (Linux/macOS).
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+
+class ContadorRequisicoes:
+    """Middleware WSGI que conta requisições atendidas e em andamento.
+
+    Ao atingir ``maximo`` requisições (0 = sem limite), chama ``ao_atingir``
+    uma única vez, para que o worker seja reciclado e a memória liberada.
+    """
+
+    def __init__(self, wsgi_app, maximo, ao_atingir):
+        self.wsgi_app = wsgi_app
+        self.maximo = maximo
+        self.ao_atingir = ao_atingir
+        self.atendidas = 0
+        self.em_andamento = 0
+        self._lock = threading.Lock()
+
+    def _finalizar(self):
+        with self._lock:
+            self.em_andamento -= 1
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.atendidas += 1
+            self.em_andamento += 1
+            atingiu = self.maximo and self.atendidas == self.maximo
+        if atingiu:
+            self.ao_atingir()
+        try:
+            resposta = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._finalizar()
+            raise
+        # O término conta quando o corpo termina de ser enviado (inclusive streams)
+        return ClosingIterator(resposta, [self._finalizar])
+
+
+def executar_worker(sock, host, port, max_requisicoes, timeout_encerramento):
+    """Laço de um worker: atende no socket herdado até ser encerrado."""
+    # Já carregada pelo mestre antes do fork: apenas obtém os objetos
+    from app import app, executor_hash, backend
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    parar = threading.Event()
+
+    def encerrar(*_):
+        # shutdown() precisa ser chamado fora da thread de serve_forever
+        if not parar.is_set():
+            parar.set()
+            threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+    contador = ContadorRequisicoes(app, max_requisicoes, encerrar)
+    servidor = make_server(host, port, contador, threaded=True, fd=sock.fileno())
+    # O SIGTERM só é tratado com o servidor já criado; antes disso o worker não
+    # atende nada e a ação padrão (terminar) basta. Um shutdown() pedido antes
+    # de serve_forever faz o laço terminar assim que começa.
+    signal.signal(signal.SIGTERM, encerrar)
+    servidor.serve_forever()
+
+    # Aguarda as requisições em andamento, com limite para streams longos (SSE)
+    limite = time.monotonic() + timeout_encerramento
+    while contador.em_andamento > 0 and time.monotonic() < limite:
+        time.sleep(0.1)
+
+    # os._exit não roda atexit: os processos de hash criados pelo worker
+    # herdaram o socket e precisam ser encerrados explicitamente
+    executor_hash.encerrar()
+    backend.fechar()
+    os._exit(0)
+
+
+class Mestre:
+    """Cria, monitora e recicla os processos workers."""
+
+    def __init__(self, sock, args):
+        self.sock = sock
+        self.args = args
+        self.workers = {}
+        self.geracao = 0
+        self.recarregar = False
+        self.encerrar = False
+
+    def criar_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                executar_worker(
+                    self.sock, self.args.host, self.args.port,
+                    self.args.max_requisicoes, self.args.timeout_encerramento
+                )
+            finally:
+                os._exit(1)
+        self.workers[pid] = self.geracao
+
+    def sinalizar(self, pids, sinal):
+        for pid in pids:
+            try:
+                os.kill(pid, sinal)
+            except ProcessLookupError:
+                pass
+
+    def recolher_encerrados(self):
+        """Remove workers que terminaram e repõe os da geração atual."""
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            geracao = self.workers.pop(pid, None)
+            if geracao == self.geracao and not self.encerrar:
+                self.criar_worker()
+
+    def executar(self):
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, 'recarregar', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'encerrar', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, 'encerrar', True))
+
+        for _ in range(self.args.workers):
+            self.criar_worker()
+
+        while not self.encerrar:
+            time.sleep(0.2)
+            if self.recarregar:
+                self.recarregar = False
+                antigos = list(self.workers)
+                self.geracao += 1
+                for _ in range(self.args.workers):
+                    self.criar_worker()
+                self.sinalizar(antigos, signal.SIGTERM)
+                print(f"🔄 Recarga: geração {self.geracao} com {self.args.workers} workers")
+            self.recolher_encerrados()
+
+        print("🛑 Encerrando workers...")
+        self.sinalizar(list(self.workers), signal.SIGTERM)
+        limite = time.monotonic() + self.args.timeout_encerramento + 5
+        while self.workers and time.monotonic() < limite:
+            time.sleep(0.1)
+            self.recolher_encerrados()
+        self.sinalizar(list(self.workers), signal.SIGKILL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de produção multiprocesso da API de tarefas.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', os.cpu_count() or 1)),
+                        help='número de processos workers (padrão: número de CPUs)')
+    parser.add_argument('--max-requisicoes', type=int, default=int(os.environ.get('MAX_REQUISICOES', 0)),
+                        help='requisições por worker antes de reciclá-lo (0 = sem limite)')
+    parser.add_argument('--timeout-encerramento', type=float,
+                        default=float(os.environ.get('TIMEOUT_ENCERRAMENTO', 30)),
+                        help='segundos para concluir requisições em andamento ao encerrar um worker')
+    parser.add_argument('--backlog', type=int, default=2048)
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit('servidor.py requer fork (Linux/macOS); no Windows use: uvicorn asgi:application')
+
+    # Lidos pela aplicação ao ser importada: os CPUs do hash de senhas são
+    # divididos entre os workers, as métricas de todos vão para METRICAS_DIR
+    # e, salvo API_DOCS=1, o Swagger UI fica desligado (o flasgger nem é importado)
+    os.environ['WORKERS'] = str(args.workers)
+    os.environ.setdefault('API_DOCS', '0')
+    metricas_dir_temporario = 'METRICAS_DIR' not in os.environ
+    if metricas_dir_temporario:
+        os.environ['METRICAS_DIR'] = tempfile.mkdtemp(prefix='metricas-tarefas-')
+
+    # Pré-carregamento: importada no mestre, herdada pelos workers via fork
+    from app import init_db
+    from metricas import limpar_diretorio
+
+    # Contadores de uma execução anterior não devem somar aos desta
+    limpar_diretorio(os.environ['METRICAS_DIR'])
+
+    versao = init_db()
+    print(f"✅ Banco inicializado (esquema v{versao})")
+
+    familia = socket.AF_INET6 if ':' in args.host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    print(f"🚀 API rodando em: http://{args.host}:{args.port} ({args.workers} workers, pid {os.getpid()})")
+    try:
+        Mestre(sock, args).executar()
+    finally:
+        if metricas_dir_temporario:
+            shutil.rmtree(os.environ['METRICAS_DIR'], ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
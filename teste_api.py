@@ -1,12 +1,34 @@
 #!/usr/bin/env python3
 """
 Script para testar a API Todo após remoção do Swagger
+
+    python teste_api.py           # contra o servidor em BASE_URL
+    python teste_api.py --local   # sem servidor: aplicação e repositórios no próprio processo
+
+Com --local, as verificações usam um SQLite temporário, ou o PostgreSQL de
+DATABASE_URL quando ela for postgresql://... (veja o README).
 """
 
 import requests
+import asyncio
 import json
+import os
+import re
+import sys
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from contextlib import contextmanager
 
-BASE_URL = "http://localhost:5000"
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:5000")
+# Mesma DATABASE_URL do servidor; o plano de consultas só é verificado no SQLite
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///todo_list.db")
+DATABASE = DATABASE_URL[len("sqlite:///"):] if DATABASE_URL.startswith("sqlite:///") else None
+POSTGRES = DATABASE_URL.startswith(("postgresql://", "postgres://"))
 
 def test_health():
     """Testar endpoint de health"""
@@ -69,7 +91,607 @@ def test_tarefas(token):
         print(f"Erro: {e}")
         return False
 
+def test_metricas():
+    """Testar endpoint de métricas do Prometheus"""
+    print("\n🔍 Testando endpoint /metrics...")
+    try:
+        response = requests.get(f"{BASE_URL}/metrics")
+        print(f"Status: {response.status_code}")
+        linhas = [linha for linha in response.text.splitlines() if 'endpoint="login_usuario"' in linha]
+        print(f"Amostras do login: {len(linhas)}")
+        return response.status_code == 200 and any(l.startswith('api_tarefas_requisicoes_total') for l in linhas)
+    except Exception as e:
+        print(f"Erro: {e}")
+        return False
+
+def test_plano_consultas(database=None):
+    """Verificar se as consultas de tarefas usam índices"""
+    print("\n🔍 Verificando plano das consultas de tarefas...")
+    from repositorios import TarefaRepository, CAMPOS_TAREFA, ORDENACOES, ORDENACAO_PADRAO
+
+    class PlanoTarefas(TarefaRepository):
+        """Em vez de executar cada comando, guarda o plano do SQL gerado pelo repositório."""
+
+        def __init__(self, conn):
+            super().__init__(conn)
+            self.planos = []
+
+        def _executar_no_dialeto(self, sql, parametros):
+            plano = " | ".join(linha[3] for linha in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros))
+            self.planos.append(plano)
+            return self.conn.execute("SELECT NULL WHERE 0")
+
+    try:
+        conn = sqlite3.connect(database or DATABASE)
+        tarefas = PlanoTarefas(conn)
+        # Listagens: cada ordenação, com cursor (keyset) e com filtros
+        for ordenacao in ORDENACOES:
+            tarefas.listar(1, CAMPOS_TAREFA, {}, ordenacao, limite=51)
+            tarefas.listar(1, CAMPOS_TAREFA, {}, ordenacao, cursor=("2024-01-01 00:00:00", 10), limite=51)
+            tarefas.listar(1, CAMPOS_TAREFA, {"concluida": False}, ordenacao, limite=51)
+            tarefas.listar(1, CAMPOS_TAREFA, {"busca": ["comp"]}, ordenacao, limite=51)
+        tarefas.listar(1, CAMPOS_TAREFA, {"criada_apos": "2024-01-01", "criada_antes": "2025-01-01"}, limite=51)
+        tarefas.listar(1, CAMPOS_TAREFA, {"concluida": True, "busca": ["comp", "lei"]}, limite=51)
+        list(tarefas.lotes_listagem(1, ["id", "descricao"], {}, ORDENACAO_PADRAO, 100))
+        # Leituras e escritas de uma tarefa, versões, sincronização e estatísticas
+        tarefas.buscar(1, 1)
+        tarefas.alterar(1, 1, concluida=True, versao_esperada=1)
+        tarefas.remover(1, 1)
+        tarefas.versao(1)
+        tarefas.mudancas(1, 0)
+        tarefas.estatisticas(1, dias=30)
+        conn.close()
+
+        ok = True
+        for plano in tarefas.planos:
+            print(f"Plano: {plano}")
+            # Nem varredura completa da tabela nem ordenação em B-tree temporária
+            if re.search(r"SCAN tarefas\b", plano) or "TEMP B-TREE" in plano:
+                print("   ⚠️ consulta sem índice adequado")
+                ok = False
+        return ok
+    except Exception as e:
+        print(f"Erro: {e}")
+        return False
+
+# ===== VERIFICAÇÕES LOCAIS (--local) =====
+# Rodam no próprio processo, cada uma com bancos temporários
+
+def banco_temporario():
+    """Cria um banco SQLite migrado em um diretório temporário e retorna o caminho."""
+    from repositorios import criar_backend
+    caminho = os.path.join(tempfile.mkdtemp(), "teste.db")
+    criar_backend(f"sqlite:///{caminho}").inicializar()
+    return caminho
+
+def test_shards_pool_unitario():
+    """Criar tarefas com shards e pools de uma única conexão"""
+    print("\n🔍 Criando tarefas com DB_SHARDS=3 e DB_POOL_TAMANHO=1...")
+    from repositorios import criar_backend, EscritorAgrupado
+    backend = criar_backend(f"sqlite:///{tempfile.mkdtemp()}/teste.db", tamanho_pool=1, timeout_pool=1, shards=3)
+    try:
+        backend.inicializar()
+        # Um bloco por id: cada inserção reserva ids no diretório
+        backend.alocador.tamanho_bloco = 1
+        # A conexão do diretório fica com a "requisição", como após a autenticação
+        with backend.pool.conexao():
+            with backend.pool_tarefas(1).conexao() as conn:
+                tarefas = backend.tarefas(conn)
+                tarefas.inserir(1, "direta")
+                tarefas.confirmar()
+            escritor = EscritorAgrupado(backend.pool_tarefas(2).fabrica, backend.tarefas, nome="escritor-teste")
+            criada = escritor.submeter(lambda tarefas: tarefas.inserir(2, "agrupada")).result(timeout=5)
+        print(f"Tarefa criada pelo escritor: {dict(criada)}")
+        return True
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+    finally:
+        backend.fechar()
+
+_aplicacao_local = None
+
+def cliente_local():
+    """Cliente de teste da aplicação, com um usuário novo autenticado.
+
+    O banco é um SQLite temporário, ou o PostgreSQL de DATABASE_URL quando ela
+    aponta para um (as tabelas são compartilhadas, mas cada usuário é novo).
+
+    A aplicação é importada uma única vez (a configuração vem do ambiente);
+    cada chamada registra outro usuário, para que as verificações não se afetem.
+    Retorna (cliente, cabeçalhos de autenticação).
+    """
+    global _aplicacao_local
+    if _aplicacao_local is None:
+        if not POSTGRES:
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'teste.db')}"
+        os.environ.setdefault("HASH_WORKERS", "0")
+        os.environ.setdefault("HASH_METODO", "pbkdf2:sha256:1000")
+        import app as aplicacao
+        aplicacao.init_db()
+        _aplicacao_local = aplicacao
+    cliente = _aplicacao_local.app.test_client()
+    email = f"local-{os.urandom(6).hex()}@teste.com"
+    cliente.post("/registro", json={"nome": "Teste", "email": email, "senha": "123456"})
+    token = cliente.post("/login", json={"email": email, "senha": "123456"}).get_json()["token"]
+    return cliente, {"Authorization": f"Bearer {token}"}
+
+def test_migracoes_local():
+    """Migrações: o banco chega à última versão do backend e repetir init_db não reaplica nada"""
+    print("\n🔍 Testando migrações do esquema...")
+    cliente_local()
+    from repositorios import MIGRACOES, MIGRACOES_POSTGRES
+    try:
+        ultima = (MIGRACOES_POSTGRES if POSTGRES else MIGRACOES)[-1][0]
+        versoes = [_aplicacao_local.init_db(), _aplicacao_local.init_db()]
+        print(f"Backend {_aplicacao_local.backend.nome}: versões {versoes} (última {ultima})")
+        return versoes == [ultima, ultima]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_memoria_stream_local():
+    """NDJSON em streaming: o pico de memória não cresce com o número de tarefas, ao contrário da lista"""
+    print("\n🔍 Medindo o pico de memória da listagem (tracemalloc)...")
+    cliente, headers = cliente_local()
+
+    def pico(stream):
+        cabecalhos = {**headers, "Accept": "application/x-ndjson"} if stream else headers
+        tracemalloc.start()
+        try:
+            r = cliente.get("/tarefas", headers=cabecalhos, buffered=False)
+            # O corpo é consumido e descartado bloco a bloco, como faria um cliente em streaming
+            tamanho = sum(len(bloco) for bloco in r.response)
+            r.close()
+            return tamanho, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    try:
+        medidas = {}
+        criadas = 0
+        for total in (2000, 8000):
+            while criadas < total:
+                cliente.post("/tarefas/lote", headers=headers, json={"tarefas": [
+                    {"descricao": f"tarefa para medir a memória da listagem número {i}"}
+                    for i in range(criadas, criadas + 2000)
+                ]})
+                criadas += 2000
+            for stream in (False, True):
+                tamanho, maximo = pico(stream)
+                medidas[total, stream] = maximo
+                print(f"{total} tarefas, {'NDJSON' if stream else 'lista JSON'}: corpo {tamanho / 1024:.0f} KiB, pico {maximo / 1024:.0f} KiB")
+        # A lista cresce com o número de tarefas; o stream fica limitado ao tamanho dos lotes
+        return (medidas[8000, True] < 2 * medidas[2000, True]
+                and medidas[8000, False] > 2 * medidas[2000, False]
+                and medidas[8000, True] * 4 < medidas[8000, False])
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_cache_tokens_local():
+    """Cache de tokens: verificação de um token já visto vs. jwt.decode a cada requisição"""
+    print("\n🔍 Medindo a verificação de tokens com e sem cache...")
+    cliente, headers = cliente_local()
+    aplicacao = _aplicacao_local
+    token = headers["Authorization"][len("Bearer "):]
+
+    def sem_cache():
+        aplicacao.cache_tokens.limpar()
+        aplicacao.verificar_token(token)
+
+    try:
+        aplicacao.verificar_token(token)
+        vezes = 20000
+        com = min(timeit.repeat(lambda: aplicacao.verificar_token(token), number=vezes, repeat=3)) / vezes
+        sem = min(timeit.repeat(sem_cache, number=vezes, repeat=3)) / vezes
+        print(f"Por verificação: com cache {com * 1e6:.2f} µs, sem cache {sem * 1e6:.2f} µs ({sem / com:.0f}x)")
+
+        # Tokens adulterados nunca entram no cache: continuam recusados
+        adulterado = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+        codigos = [cliente.get("/tarefas", headers={"Authorization": f"Bearer {adulterado}"}).status_code for _ in range(2)]
+        print(f"Token adulterado: {codigos}")
+        return com * 3 < sem and codigos == [401, 401]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_lote_local():
+    """Operações em lote: cada item inválido recebe 400 sem afetar os demais"""
+    print("\n🔍 Testando /tarefas/lote com itens inválidos...")
+    cliente, headers = cliente_local()
+    try:
+        r = cliente.post("/tarefas/lote", headers=headers, json={"tarefas": [
+            {"descricao": "válida"}, {"descricao": ["lista"]}, {"descricao": {"x": 1}}, {}, "texto"
+        ]})
+        status = [item["status"] for item in r.get_json()["resultados"]]
+        print(f"POST: {r.status_code} {status}")
+        ok = r.status_code == 200 and status == [201, 400, 400, 400, 400]
+        tarefa_id = r.get_json()["resultados"][0]["tarefa"]["id"]
+
+        r = cliente.patch("/tarefas/lote", headers=headers, json={"tarefas": [
+            {"id": tarefa_id, "concluida": True}, {"id": tarefa_id, "descricao": 7},
+            {"id": tarefa_id, "descricao": ""}, {"id": 999999}, {"id": True},
+            {"id": tarefa_id, "concluida": "false"}, {"id": tarefa_id, "concluida": 0}
+        ]})
+        status = [item["status"] for item in r.get_json()["resultados"]]
+        print(f"PATCH: {r.status_code} {status}")
+        ok = ok and r.status_code == 200 and status == [200, 400, 400, 404, 400, 400, 400]
+        # "false" não pode ter sido gravado como verdadeiro, nem 0 como falso
+        ok = ok and cliente.get(f"/tarefas/{tarefa_id}", headers=headers).get_json()["tarefa"]["concluida"] is True
+
+        r = cliente.delete("/tarefas/lote", headers=headers, json={"ids": [tarefa_id, tarefa_id, "1"]})
+        status = [item["status"] for item in r.get_json()["resultados"]]
+        print(f"DELETE: {r.status_code} {status}")
+        ok = ok and r.status_code == 200 and status == [200, 404, 400]
+
+        # Corpos inválidos (inclusive JSON que não é objeto) e campos de outro tipo nas rotas de uma tarefa
+        outra_id = cliente.post("/tarefas", headers=headers, json={"descricao": "outra"}).get_json()["tarefa"]["id"]
+        codigos = [
+            cliente.post("/tarefas/lote", headers=headers, json={"tarefas": []}).status_code,
+            cliente.post("/tarefas/lote", headers=headers, json=[1]).status_code,
+            cliente.patch("/tarefas/lote", headers=headers, json=[1]).status_code,
+            cliente.delete("/tarefas/lote", headers=headers, json="ids").status_code,
+            cliente.post("/tarefas", headers=headers, json={"descricao": ["lista"]}).status_code,
+            cliente.post("/tarefas", headers=headers, json=["lista"]).status_code,
+            cliente.put(f"/tarefas/{outra_id}", headers=headers, json={"concluida": "false"}).status_code,
+        ]
+        print(f"Corpos inválidos: {codigos}")
+        return ok and codigos == [400] * 7
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+@contextmanager
+def comandos_executados():
+    """Registra, via ``set_trace_callback``, os comandos SQL executados nas conexões do pool.
+
+    O SQLite também reporta os passos internos dos gatilhos (linhas com ``--``
+    e repetições do comando que os disparou); só os comandos de primeiro
+    nível entram na lista.
+    """
+    registrados = []
+
+    def registrar(comando):
+        if not comando.startswith("--") and (not registrados or registrados[-1] != comando):
+            registrados.append(comando)
+
+    # Na classe, para valer para todos os pools da aplicação
+    classe = type(_aplicacao_local.pool)
+    obter, devolver = classe.obter, classe.devolver
+
+    def obter_rastreada(pool_conexoes):
+        conn = obter(pool_conexoes)
+        conn.set_trace_callback(registrar)
+        return conn
+
+    def devolver_sem_rastreio(pool_conexoes, conn):
+        conn.set_trace_callback(None)
+        devolver(pool_conexoes, conn)
+
+    classe.obter, classe.devolver = obter_rastreada, devolver_sem_rastreio
+    try:
+        yield registrados
+    finally:
+        classe.obter, classe.devolver = obter, devolver
+
+def test_quantidade_consultas():
+    """Cada rota executa um número fixo de comandos SQL, independente do número de tarefas"""
+    print("\n🔍 Contando comandos SQL por requisição...")
+    if POSTGRES:
+        print("(somente no SQLite: set_trace_callback)")
+        return True
+    cliente, headers = cliente_local()
+
+    def contar(requisicao, esperado):
+        with comandos_executados() as comandos:
+            r = requisicao()
+        print(f"{r.status_code}: {len(comandos)} comando(s) (esperado {esperado})")
+        if len(comandos) != esperado:
+            for comando in comandos:
+                print(f"   {comando}")
+        return r, len(comandos) == esperado
+
+    try:
+        tarefa_id = cliente.post("/tarefas", headers=headers, json={"descricao": "contar"}).get_json()["tarefa"]["id"]
+        # Versão do usuário (ETag) + listagem
+        _, ok = contar(lambda: cliente.get("/tarefas", headers=headers), 2)
+        for i in range(30):
+            cliente.post("/tarefas", headers=headers, json={"descricao": f"mais {i}"})
+        r, ok_muitas = contar(lambda: cliente.get("/tarefas?limit=50", headers=headers), 2)
+        ok = ok and ok_muitas and len(r.get_json()["tarefas"]) == 31
+
+        # Escritas: BEGIN + comando com RETURNING + COMMIT
+        resultados = [
+            contar(lambda: cliente.get(f"/tarefas/{tarefa_id}", headers=headers), 1)[1],
+            contar(lambda: cliente.post("/tarefas", headers=headers, json={"descricao": "nova"}), 3)[1],
+            contar(lambda: cliente.put(f"/tarefas/{tarefa_id}", headers=headers, json={"concluida": True}), 3)[1],
+            contar(lambda: cliente.delete(f"/tarefas/{tarefa_id}", headers=headers), 3)[1],
+        ]
+        return ok and all(resultados)
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_etags_local():
+    """ETags: 304 com If-None-Match atual, 412 com If-Match desatualizado"""
+    print("\n🔍 Testando ETags e requisições condicionais...")
+    cliente, headers = cliente_local()
+    try:
+        tarefa = cliente.post("/tarefas", headers=headers, json={"descricao": "condicional"}).get_json()["tarefa"]
+        url = f"/tarefas/{tarefa['id']}"
+
+        lista = cliente.get("/tarefas", headers=headers)
+        r = cliente.get("/tarefas", headers={**headers, "If-None-Match": lista.headers["ETag"]})
+        codigos = [r.status_code]
+
+        antiga = cliente.get(url, headers=headers).headers["ETag"]
+        codigos.append(cliente.get(url, headers={**headers, "If-None-Match": antiga}).status_code)
+        r = cliente.put(url, headers={**headers, "If-Match": antiga}, json={"concluida": True})
+        codigos.append(r.status_code)
+        atual = r.headers.get("ETag")
+        # A lista mudou e o ETag antigo da tarefa não vale mais
+        codigos.append(cliente.get("/tarefas", headers={**headers, "If-None-Match": lista.headers["ETag"]}).status_code)
+        codigos.append(cliente.put(url, headers={**headers, "If-Match": antiga}, json={"descricao": "x"}).status_code)
+        codigos.append(cliente.delete(url, headers={**headers, "If-Match": antiga}).status_code)
+        codigos.append(cliente.get(url, headers={**headers, "If-None-Match": antiga}).status_code)
+        codigos.append(cliente.delete(url, headers={**headers, "If-Match": atual}).status_code)
+        print(f"Status: {codigos}")
+        return codigos == [304, 304, 200, 200, 412, 412, 200, 200]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_mudancas_local():
+    """Sincronização incremental: só o que mudou depois de ``desde``"""
+    print("\n🔍 Testando /tarefas/mudancas...")
+    cliente, headers = cliente_local()
+    try:
+        ids = [cliente.post("/tarefas", headers=headers, json={"descricao": f"sync {i}"}).get_json()["tarefa"]["id"]
+               for i in range(3)]
+        inicial = cliente.get("/tarefas/mudancas?desde=0", headers=headers).get_json()
+        ok = sorted(t["id"] for t in inicial["alteradas"]) == ids and inicial["excluidas"] == []
+
+        cliente.put(f"/tarefas/{ids[0]}", headers=headers, json={"concluida": True})
+        cliente.delete(f"/tarefas/{ids[1]}", headers=headers)
+        delta = cliente.get(f"/tarefas/mudancas?desde={inicial['versao']}", headers=headers).get_json()
+        print(f"Delta: alteradas={[t['id'] for t in delta['alteradas']]} excluidas={delta['excluidas']}")
+        ok = ok and [t["id"] for t in delta["alteradas"]] == [ids[0]] and delta["excluidas"] == [ids[1]]
+        ok = ok and delta["alteradas"][0]["concluida"] is True and delta["versao"] > inicial["versao"]
+
+        vazio = cliente.get(f"/tarefas/mudancas?desde={delta['versao']}", headers=headers).get_json()
+        ok = ok and vazio["alteradas"] == [] and vazio["excluidas"] == []
+        codigos = [cliente.get(f"/tarefas/mudancas{q}", headers=headers).status_code for q in ("", "?desde=-1", "?desde=x")]
+        print(f"Parâmetros inválidos: {codigos}")
+        return ok and codigos == [400, 400, 400]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_eventos_local():
+    """SSE: reenvio desde Last-Event-ID e entrega ao vivo das escritas"""
+    print("\n🔍 Testando /tarefas/eventos...")
+    cliente, headers = cliente_local()
+    try:
+        primeira = cliente.post("/tarefas", headers=headers, json={"descricao": "antes"}).get_json()["tarefa"]
+        r = cliente.get("/tarefas/eventos", headers={**headers, "Last-Event-ID": "0"}, buffered=False)
+        try:
+            blocos = iter(r.response)
+            ok = r.mimetype == "text/event-stream" and next(blocos).startswith(b"retry:")
+            # Reenvio do que aconteceu depois de Last-Event-ID
+            reenviado = next(blocos).decode()
+            ok = ok and "event: tarefa_criada" in reenviado and f'"id": {primeira["id"]}' in reenviado
+
+            # Escritas feitas com o stream aberto chegam pela fila do assinante
+            cliente.put(f"/tarefas/{primeira['id']}", headers=headers, json={"concluida": True})
+            cliente.delete(f"/tarefas/{primeira['id']}", headers=headers)
+            ao_vivo = [next(blocos).decode() for _ in range(2)]
+            print(f"Eventos ao vivo: {[bloco.splitlines()[1] for bloco in ao_vivo]}")
+            ok = ok and "event: tarefa_atualizada" in ao_vivo[0] and "event: tarefa_excluida" in ao_vivo[1]
+        finally:
+            r.close()
+
+        invalido = cliente.get("/tarefas/eventos", headers={**headers, "Last-Event-ID": "x"}).status_code
+        print(f"Last-Event-ID inválido: {invalido}")
+        return ok and invalido == 400
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_asgi_concorrencia():
+    """asgi.application atende requisições simultâneas em paralelo e fecha o corpo de cada resposta"""
+    print("\n🔍 Testando concorrência do ponto de entrada ASGI...")
+    cliente_local()
+    import asgi
+    from werkzeug.wsgi import ClosingIterator
+    aplicacao = _aplicacao_local.app
+    original = aplicacao.wsgi_app
+    threads = set()
+    fechadas = []
+
+    def lenta(environ, start_response):
+        # Simula uma requisição que espera (exportação longa, hash, commit em grupo)
+        threads.add(threading.current_thread().name)
+        time.sleep(0.5)
+        return ClosingIterator(original(environ, start_response), lambda: fechadas.append(1))
+
+    async def requisitar():
+        status = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status.append(mensagem["status"])
+
+        await asgi.application({
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/health", "raw_path": b"/health",
+            "query_string": b"", "root_path": "", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 5000)
+        }, receive, send)
+        return status[0]
+
+    async def simultaneas():
+        return await asyncio.gather(*(requisitar() for _ in range(4)))
+
+    aplicacao.wsgi_app = lenta
+    try:
+        inicio = time.perf_counter()
+        status = asyncio.run(simultaneas())
+        duracao = time.perf_counter() - inicio
+        print(f"4 requisições de 0,5 s: {duracao:.2f} s, status {status}, threads {sorted(threads)}")
+        return status == [200] * 4 and len(threads) == 4 and duracao < 1.5 and len(fechadas) == 4
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+    finally:
+        aplicacao.wsgi_app = original
+
+def test_documentacao_producao():
+    """asgi.py só importa o flasgger (Swagger UI) com API_DOCS=1"""
+    print("\n🔍 Testando documentação interativa em produção...")
+    ambiente = {nome: valor for nome, valor in os.environ.items() if nome != "API_DOCS"}
+    ambiente.update(DATABASE_URL=f"sqlite:///{banco_temporario()}", HASH_WORKERS="0")
+    codigo = "import sys, asgi; print('flasgger' in sys.modules)"
+    try:
+        carregado = [
+            subprocess.run(
+                [sys.executable, "-c", codigo], env={**ambiente, **extra}, capture_output=True,
+                text=True, timeout=60, cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.strip()
+            for extra in ({}, {"API_DOCS": "1"})
+        ]
+        print(f"flasgger importado: padrão={carregado[0]}, API_DOCS=1={carregado[1]}")
+        return carregado == ["False", "True"]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_etags_compressao_local():
+    """Cada Content-Encoding tem seu próprio ETag, aceito de volta nas condições"""
+    print("\n🔍 Testando ETags das respostas comprimidas...")
+    cliente, headers = cliente_local()
+    try:
+        # Descrições longas o bastante para a lista passar de COMPRESSAO_MINIMO
+        for i in range(20):
+            cliente.post("/tarefas", headers=headers, json={"descricao": f"tarefa comprimida {i} " * 5})
+        identidade = cliente.get("/tarefas", headers={**headers, "Accept-Encoding": "identity"})
+        comprimida = cliente.get("/tarefas", headers={**headers, "Accept-Encoding": "gzip"})
+        etag_gzip = comprimida.headers["ETag"]
+        print(f"ETags: {identidade.headers['ETag']} / {etag_gzip}")
+        ok = (comprimida.headers.get("Content-Encoding") == "gzip"
+              and etag_gzip == identidade.headers["ETag"][:-1] + '-gzip"')
+
+        r = cliente.get("/tarefas", headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": etag_gzip})
+        ok = ok and r.status_code == 304 and r.headers["ETag"] == etag_gzip
+
+        espec = [cliente.get("/api-spec.json", headers={"Accept-Encoding": c}) for c in ("identity", "gzip")]
+        etags_espec = [r.headers["ETag"] for r in espec]
+        r = cliente.get("/api-spec.json", headers={"Accept-Encoding": "identity", "If-None-Match": etags_espec[1]})
+        ok = ok and etags_espec[0] != etags_espec[1] and r.status_code == 200
+        r = cliente.get("/api-spec.json", headers={"Accept-Encoding": "gzip", "If-None-Match": etags_espec[1]})
+        ok = ok and r.status_code == 304
+
+        # If-Match com o ETag de uma variante comprimida
+        tarefa = cliente.post("/tarefas", headers=headers, json={"descricao": "if-match"}).get_json()["tarefa"]
+        etag = cliente.get(f"/tarefas/{tarefa['id']}", headers=headers).headers["ETag"][:-1] + '-gzip"'
+        r = cliente.put(f"/tarefas/{tarefa['id']}", headers={**headers, "If-Match": etag}, json={"concluida": True})
+        print(f"If-Match comprimido: {r.status_code}")
+        return ok and r.status_code == 200
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_busca_local():
+    """Filtros, busca textual e ordenação: cada usuário só encontra as próprias tarefas"""
+    print("\n🔍 Testando filtros e busca em /tarefas...")
+    cliente, headers = cliente_local()
+    _, outro = cliente_local()
+    try:
+        for descricao in ("comprar pão", "comprar café", "lavar carro"):
+            cliente.post("/tarefas", headers=headers, json={"descricao": descricao})
+        cliente.post("/tarefas", headers=outro, json={"descricao": "comprar leite"})
+        primeira = cliente.get("/tarefas?q=comprar&ordenar=descricao", headers=headers).get_json()["tarefas"][0]
+        cliente.put(f"/tarefas/{primeira['id']}", headers=headers, json={"concluida": True})
+
+        def descricoes(consulta, cabecalhos=headers):
+            return [t["descricao"] for t in cliente.get(f"/tarefas?{consulta}", headers=cabecalhos).get_json()["tarefas"]]
+
+        resultados = {
+            "q=compr&ordenar=descricao": descricoes("q=compr&ordenar=descricao"),
+            "q=leite": descricoes("q=leite"),
+            "q=comprar&concluida=false": descricoes("q=comprar&concluida=false"),
+            "ordenar=-descricao": descricoes("ordenar=-descricao"),
+            "q=comprar (outro usuário)": descricoes("q=comprar", outro),
+        }
+        for consulta, encontradas in resultados.items():
+            print(f"{consulta}: {encontradas}")
+        return list(resultados.values()) == [
+            ["comprar café", "comprar pão"], [], ["comprar pão"],
+            ["lavar carro", "comprar pão", "comprar café"], ["comprar leite"]
+        ]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+def test_estatisticas_local():
+    """Contadores de /tarefas/estatisticas acompanham criações, conclusões e exclusões"""
+    print("\n🔍 Testando /tarefas/estatisticas...")
+    cliente, headers = cliente_local()
+    try:
+        ids = [cliente.post("/tarefas", headers=headers, json={"descricao": f"conta {i}"}).get_json()["tarefa"]["id"]
+               for i in range(4)]
+        cliente.put(f"/tarefas/{ids[0]}", headers=headers, json={"concluida": True})
+        cliente.put(f"/tarefas/{ids[1]}", headers=headers, json={"concluida": True})
+        cliente.put(f"/tarefas/{ids[1]}", headers=headers, json={"concluida": False})
+        cliente.delete(f"/tarefas/{ids[2]}", headers=headers)
+
+        dados = cliente.get("/tarefas/estatisticas?dias=7", headers=headers).get_json()
+        print(f"Totais: {dados['total']} total, {dados['concluidas']} concluídas, {dados['pendentes']} pendentes")
+        # Todas as tarefas atuais foram criadas hoje (UTC); dias sem criações não aparecem
+        ok = (dados["total"], dados["concluidas"], dados["pendentes"]) == (3, 1, 2)
+        ok = ok and [dia["criadas"] for dia in dados["por_dia"]] == [3]
+
+        codigos = [cliente.get(f"/tarefas/estatisticas?dias={d}", headers=headers).status_code for d in ("0", "367", "x")]
+        print(f"Parâmetros inválidos: {codigos}")
+        return ok and codigos == [400, 400, 400]
+    except Exception as e:
+        print(f"Erro: {e!r}")
+        return False
+
+VERIFICACOES_LOCAIS = [
+    (test_migracoes_local, "Falha nas migrações do esquema"),
+    (lambda: test_plano_consultas(banco_temporario()), "Falha na verificação dos índices"),
+    (test_memoria_stream_local, "A memória da listagem em streaming cresce com o número de tarefas"),
+    (test_cache_tokens_local, "O cache de tokens não acelera a verificação"),
+    (test_lote_local, "Falha nas operações em lote"),
+    (test_quantidade_consultas, "Número de comandos SQL por requisição mudou"),
+    (test_etags_local, "Falha nas requisições condicionais"),
+    (test_mudancas_local, "Falha na sincronização incremental"),
+    (test_eventos_local, "Falha no stream de eventos"),
+    (test_asgi_concorrencia, "O ponto de entrada ASGI não atende requisições em paralelo"),
+    (test_documentacao_producao, "O flasgger é importado em produção sem API_DOCS=1"),
+    (test_etags_compressao_local, "Falha nos ETags das respostas comprimidas"),
+    (test_busca_local, "Falha nos filtros e na busca de tarefas"),
+    (test_estatisticas_local, "Falha nas estatísticas de tarefas"),
+    (test_shards_pool_unitario, "Falha ao criar tarefas com shards e pool de uma conexão"),
+]
+
+def executar_verificacoes_locais():
+    print(f"🚀 Iniciando verificações locais ({'PostgreSQL de DATABASE_URL' if POSTGRES else 'SQLite temporário'})...")
+    for verificacao, mensagem in VERIFICACOES_LOCAIS:
+        if not verificacao():
+            print(f"❌ {mensagem}")
+            exit(1)
+    print("\n✅ Todas as verificações locais passaram!")
+
 if __name__ == "__main__":
+    if "--local" in sys.argv:
+        executar_verificacoes_locais()
+        exit(0)
+
     print("🚀 Iniciando testes da API...")
     
     # Teste 1: Health Check
@@ -93,4 +715,14 @@ if __name__ == "__main__":
         print("❌ Falha no teste de tarefas")
         exit(1)
     
+    # Teste 5: Métricas
+    if not test_metricas():
+        print("❌ Falha no teste de métricas")
+        exit(1)
+    
+    # Teste 6: Índices
+    if DATABASE and not test_plano_consultas():
+        print("❌ Falha na verificação dos índices")
+        exit(1)
+    
     print("\n✅ Todos os testes passaram! API funcionando corretamente.")
\ No newline at end of file